@@ -1,6 +1,9 @@
 import os
 from openai import AzureOpenAI
 
+# Per-chunk streaming progress; set DOCASSIST_VERBOSE=1 to enable
+VERBOSE = os.environ.get("DOCASSIST_VERBOSE") == "1"
+
 def analyse_metadata(output_file: str, SRC_DIR: str):
     # Environment variables for Azure OpenAI
     endpoint = os.getenv("ENDPOINT_URL")
@@ -39,21 +42,32 @@ def analyse_metadata(output_file: str, SRC_DIR: str):
         {"role": "user", "content": [{"type": "text", "text": metadata_content}]}
     ]
 
-    # Generate completion
-    completion = client.chat.completions.create(
-        model=deployment,
-        messages=chat_prompt,
-        max_completion_tokens=13107,
-        stop=None,
-        stream=False
-    )
-
-    # Write response to TXT file
-    
+    # Open the output first so streamed tokens are written as they arrive
     with open(output_file, "w", encoding="utf-8") as out_file:
-        for choice in completion.choices:
-           # print("Response:", choice.message.content)  # Console output
-            out_file.write(choice.message.content + "\n\n")  # Save to file
+        # Generate completion (streamed)
+        completion = client.chat.completions.create(
+            model=deployment,
+            messages=chat_prompt,
+            max_completion_tokens=13107,
+            stop=None,
+            stream=True
+        )
+
+        # Write response to TXT file chunk by chunk
+        received = 0
+        for chunk in completion:
+            # Azure may send chunks without choices (e.g. prompt filter results)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                out_file.write(delta)  # Save to file
+                received += 1
+                if VERBOSE:
+                    print(f"\rReceived {received} chunks...", end="", flush=True)  # Console progress
+        out_file.write("\n\n")
+    if VERBOSE:
+        print()
 
     print(f"Documentation written to: {output_file}")
 
@@ -2,13 +2,40 @@ import os
 import json
 import re
 import ast
+import argparse
+import mmap
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 from datetime import datetime
-from typing import Tuple, List, Dict, Optional
+from typing import Tuple, List, Dict, Optional, Iterator, Iterable, Union
+
+from iterate import walk_files
+
+# Optional fast JSON backend; falls back to the stdlib when orjson isn't installed.
+# dumps_json returns UTF-8 bytes indented by 2 spaces with either backend.
+try:
+    import orjson
+
+    loads_json = orjson.loads
+
+    def dumps_json(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    loads_json = json.loads
+
+    def dumps_json(obj) -> bytes:
+        return json.dumps(obj, indent=2).encode("utf-8")
 
 # -------- CONFIG --------
 REPO_DIR = r"codehub/destination/final-year-project"  # change to your repo folder
 OUTPUT_JSON = r"codehub/extract/destination_metadata.json"
+CACHE_JSON = r"codehub/extract/.analyze_cache.json"  # reused across runs for unchanged files
+# Bump whenever extraction output changes, so caches from older code are ignored
+CACHE_VERSION = 4
 
 # File types we will process
 LANG_BY_EXT = {
@@ -22,18 +49,144 @@ LANG_BY_EXT = {
 }
 # ------------------------
 
+# Line boundaries str.splitlines() honours besides "\n" (see count_lines)
+_RARE_LINE_BREAKS = ("\r", "\v", "\f", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029")
+
+# Target extensions as a tuple, so the walker can filter names with one str.endswith call
+_CODE_SUFFIXES = tuple(LANG_BY_EXT)
+
+# Per-thread read buffer reused across files (see read_text)
+_read_buf = threading.local()
+_MIN_READ_BUF = 64 * 1024
+# Files at least this large are decoded straight from an mmap instead of being
+# copied into the read buffer first (measured break-even is ~300 KB)
+_MMAP_MIN_BYTES = 512 * 1024
+
+# Worker start method for the extraction pool. Never fork: master.py runs
+# documentation threads (openai/httpx) while repos are analyzed, and forking a
+# multi-threaded process can deadlock the child. forkserver where the platform
+# has it (POSIX), else spawn (Windows).
+_POOL_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+
+# Precompiled patterns (compiled once per process, reused for every file)
+# Comment strippers: one alternation per language that also matches string
+# literals, so comment markers inside strings (e.g. "http://...") survive.
+# PHP string/comment rules only hold inside <?php ... ?> blocks: a closing tag
+# swallows the inline HTML up to the next opening tag as one "html" token, and
+# an apostrophe in that text (e.g. "<p>Don't</p>") never opens a string.
+# Heredoc/nowdoc bodies are kept verbatim too, for the same reason.
+_PHP_COMMENT_RE = re.compile(
+    r"""(?P<comment>/\*.*?\*/|(?://|#)(?:[^\n?]|\?(?!>))*)"""
+    r"""|(?P<string><<<[ \t]*(?P<doc_q>["']?)(?P<doc_id>[A-Za-z_]\w*)(?P=doc_q)\n(?:.*?\n)?[ \t]*(?P=doc_id)\b"""
+    r"""|'(?:\\.|[^'\\])*'|"(?:\\.|[^"\\])*")"""
+    r"""|\?>(?P<html>.*?)(?P<open><\?(?i:php\b|=)|\Z)""",
+    re.S,
+)
+_PHP_OPEN_TAG_RE = re.compile(r"<\?(?i:php\b|=)")
+# Outside PHP blocks: plain comment removal, no string handling
+_PHP_TEXT_COMMENT_RE = re.compile(r"/\*.*?\*/|//[^\n]*|#[^\n]*", re.S)
+_JS_COMMENT_RE = re.compile(
+    r"""(?P<comment>/\*.*?\*/|//[^\n]*)"""
+    r"""|(?P<string>'(?:\\.|[^'\\\n])*'|"(?:\\.|[^"\\\n])*"|`(?:\\.|[^`\\])*`)""",
+    re.S,
+)
+
+# Every def/class/import result needs one of these words somewhere in the source
+_PY_SYMBOL_HINT_RE = re.compile(r"\b(?:def|class|import)\b")
+
+# AST fields that hold nested statement lists (if/for/while/with/try/match/def bodies)
+_STMT_BLOCK_FIELDS = ("body", "handlers", "orelse", "finalbody", "cases")
+
+# Symbol patterns: one alternation per language, scanned once with finditer.
+# Each alternative has exactly one named group; match.lastgroup says which hit.
+_PHP_SYMBOL_RE = re.compile("|".join([
+    r"\bfunction\s+&?\s*(?P<func>[A-Za-z_][A-Za-z0-9_]*)\s*\(",
+    r"\bclass\s+(?P<cls>[A-Za-z_][A-Za-z0-9_]*)\b",
+    r"\binterface\s+(?P<iface>[A-Za-z_][A-Za-z0-9_]*)\b",
+    r"\btrait\s+(?P<trait>[A-Za-z_][A-Za-z0-9_]*)\b",
+    r"\buse\s+(?P<use>[A-Za-z_\\][A-Za-z0-9_\\]*(?:\s+as\s+\w+)?)\s*;",
+    r"""(?P<include>\b(?:include|include_once|require|require_once)\s*\(\s*[^'"]+['"]\s*\)\s*;)""",
+]))
+_PHP_BUCKET = {"func": 0, "cls": 1, "iface": 1, "trait": 1, "use": 2, "include": 3}
+
+# JS functions and classes (see _iter_js_symbols for names nested in a match)
+_JS_SYMBOL_RE = re.compile("|".join([
+    r"\bexport\s+function\s+(?P<export_func>[A-Za-z_$][\w$]*)\s*\(",
+    r"\bfunction\s+(?P<func>[A-Za-z_$][\w$]*)\s*\(",
+    r"\bexport\s+(?:const|let|var)\s+(?P<export_arrow>[A-Za-z_$][\w$]*)\s*=\s*(?:async\s*)?\([^\)]*\)\s*=>",
+    r"\b(?:const|let|var)\s+(?P<func_expr>[A-Za-z_$][\w$]*)\s*=\s*(?:async\s*)?function\b"
+    r"(?:\s+(?P<func_expr_name>[A-Za-z_$][\w$]*)\s*\()?",
+    r"\b(?:const|let|var)\s+(?P<arrow>[A-Za-z_$][\w$]*)\s*=\s*(?:async\s*)?\([^\)]*\)\s*=>",
+    r"\bclass\s+(?P<cls>[A-Za-z_$][\w$]*)\b",
+]))
+_JS_BUCKET = {
+    "export_func": 0, "func": 0, "export_arrow": 0, "func_expr": 0, "func_expr_name": 0, "arrow": 0,
+    "cls": 1,
+}
+# Import patterns stay separate scans: "import x = require('m')" (TS) is both an
+# import-from and a require, and [^'"]+ can run past other statements.
+_JS_IMPORT_RES = (
+    re.compile(r"""import\s+[^'"]+['"]"""),          # import X from 'mod'
+    re.compile(r"""import\s*['"][^'"]+['"]"""),        # bare import 'mod'
+    re.compile(r"""require\(\s*['"][^'"]+['"]\s*\)"""),  # require('mod')
+)
+
+
+def _read_into_buffer(f, size: int) -> memoryview:
+    """
+    Read the rest of the open (unbuffered) file f into a per-thread reusable
+    bytearray (grown to the largest file seen) and return a view of the bytes read.
+    """
+    buf = getattr(_read_buf, "buf", None)
+    if buf is None or len(buf) <= size:
+        buf = _read_buf.buf = bytearray(max(size + 1, _MIN_READ_BUF))
+    view = memoryview(buf)
+    n = 0
+    while True:
+        got = f.readinto(view[n:])
+        if not got:
+            break
+        n += got
+        if n == len(buf):  # file grew while reading
+            buf = _read_buf.buf = buf + bytearray(len(buf))
+            view = memoryview(buf)
+    return view[:n]
+
 
 def read_text(path: Path) -> str:
-    """Read file text safely."""
+    """
+    Read file text safely.
+    Large files are decoded directly from a read-only mmap (no userspace copy);
+    smaller ones, where mmap setup costs more than it saves, via the read buffer.
+    """
     try:
-        return path.read_text(encoding="utf-8", errors="ignore")
+        with open(path, "rb", buffering=0) as f:
+            size = os.fstat(f.fileno()).st_size
+            if size >= _MMAP_MIN_BYTES:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    text = str(mm, "utf-8", "ignore")
+            else:
+                text = str(_read_into_buffer(f, size), "utf-8", "ignore")
     except Exception:
         return ""
+    # Match text-mode reads: normalize CRLF/CR newlines
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
 
 
 def count_lines(content: str) -> int:
-    """Count logical lines in content."""
-    return len(content.splitlines()) if content else 0
+    """
+    Count logical lines in content (same result as len(content.splitlines())).
+    Common case is a C-level count of "\n" with no per-line string allocation.
+    """
+    if not content:
+        return 0
+    for sep in _RARE_LINE_BREAKS:
+        if sep in content:
+            return len(content.splitlines())
+    return content.count("\n") + (not content.endswith("\n"))
 
 
 def count_chars(content: str) -> int:
@@ -41,25 +194,68 @@ def count_chars(content: str) -> int:
     return len(content) if content else 0
 
 
-def iso_mtime(path: Path) -> str:
-    """Return last modified timestamp ISO string."""
-    try:
-        return datetime.fromtimestamp(path.stat().st_mtime).isoformat()
-    except Exception:
+def _iso_from_ns(mtime_ns: Optional[int]) -> str:
+    """Return last modified timestamp ISO string (same float as os.stat's st_mtime)."""
+    if mtime_ns is None:
         return ""
+    return datetime.fromtimestamp(mtime_ns // 10**9 + (mtime_ns % 10**9) * 1e-9).isoformat()
 
 
-def rel_to_root(path: Path, root: Path) -> str:
-    try:
-        return str(path.resolve().relative_to(root.resolve()))
-    except Exception:
-        return str(path)
+def _relative_to_root(path_str: str, root_str: str) -> str:
+    """
+    Path of path_str relative to root_str (same result as os.path.relpath for
+    paths under root): a plain prefix slice, with relpath only as a fallback.
+    """
+    prefix = os.path.join(root_str, "")
+    if path_str.startswith(prefix):
+        return path_str[len(prefix):]
+    return os.path.relpath(path_str, root_str)
+
+
+def _keep_string(match: "re.Match[str]") -> str:
+    return match.group("string") or ""
+
+
+def _keep_php_code(match: "re.Match[str]") -> str:
+    if match.group("string") is not None:
+        return match.group("string")
+    if match.group("html") is not None:
+        return "?>" + _PHP_TEXT_COMMENT_RE.sub("", match.group("html")) + match.group("open")
+    return ""
+
+
+def _strip_comments(src: str, lang: str) -> str:
+    """Remove comments in a single pass, leaving string literals untouched."""
+    if lang != "php":
+        return _JS_COMMENT_RE.sub(_keep_string, src)
+    # Text before the first <?php / <?= tag is inline HTML, not code
+    tag = _PHP_OPEN_TAG_RE.search(src)
+    if tag is None:
+        return _PHP_TEXT_COMMENT_RE.sub("", src)
+    head = _PHP_TEXT_COMMENT_RE.sub("", src[:tag.start()]) + tag.group()
+    return head + _PHP_COMMENT_RE.sub(_keep_php_code, src[tag.end():])
 
 
 # ---------- Python extraction (AST) ----------
+def _iter_statements(tree: ast.Module):
+    """
+    Yield statement-level nodes breadth-first (same order as ast.walk), only
+    descending into statement blocks so expression nodes are never visited.
+    """
+    queue = deque(tree.body)
+    while queue:
+        node = queue.popleft()
+        yield node
+        for field in _STMT_BLOCK_FIELDS:
+            queue.extend(getattr(node, field, ()))
+
+
 def extract_python_symbols(content: str) -> Tuple[List[str], List[str], List[str]]:
     """Return (functions, classes, imports) using Python AST; only top-level names."""
     funcs, classes, imports = [], [], []
+    # Fast path: nothing to find, so skip building the AST
+    if not _PY_SYMBOL_HINT_RE.search(content):
+        return funcs, classes, imports
     try:
         tree = ast.parse(content)
         # module-level funcs/classes
@@ -68,8 +264,8 @@ def extract_python_symbols(content: str) -> Tuple[List[str], List[str], List[str
                 funcs.append(node.name)
             elif isinstance(node, ast.ClassDef):
                 classes.append(node.name)
-        # imports (walk)
-        for node in ast.walk(tree):
+        # imports (statements only, including nested blocks)
+        for node in _iter_statements(tree):
             if isinstance(node, ast.Import):
                 imports.extend([a.name for a in node.names])
             elif isinstance(node, ast.ImportFrom):
@@ -92,21 +288,16 @@ def extract_php_symbols(content: str) -> Tuple[List[str], List[str], List[str],
     - use statements
     - include/require(_once)
     """
-    # Remove common comment blocks to reduce false positives
-    content_no_comments = re.sub(r"/\*.*?\*/", "", content, flags=re.S)
-    content_no_comments = re.sub(r"//.*?$", "", content_no_comments, flags=re.M)
-    content_no_comments = re.sub(r"#.*?$", "", content_no_comments, flags=re.M)
+    # Remove comments to reduce false positives
+    content_no_comments = _strip_comments(content, "php")
 
-    func_pat = re.compile(r"\bfunction\s+&?\s*([A-Za-z_][A-Za-z0-9_]*)\s*\(", re.M)
-    class_pat = re.compile(r"\bclass\s+([A-Za-z_][A-Za-z0-9_]*)\b", re.M)
-    iface_pat = re.compile(r"\binterface\s+([A-Za-z_][A-Za-z0-9_]*)\b", re.M)
-    trait_pat = re.compile(r"\btrait\s+([A-Za-z_][A-Za-z0-9_]*)\b", re.M)
-
-    functions = func_pat.findall(content_no_comments)
-    classes = class_pat.findall(content_no_comments) + iface_pat.findall(content_no_comments) + trait_pat.findall(content_no_comments)
-
-    uses = re.findall(r"\buse\s+([A-Za-z_\\][A-Za-z0-9_\\]*(?:\s+as\s+\w+)?)\s*;", content_no_comments)
-    includes = re.findall(r"""\b(?:include|include_once|require|require_once)\s*\(\s*[^'"]+['"]\s*\)\s*;""", content_no_comments)
+    functions: List[str] = []
+    classes: List[str] = []
+    uses: List[str] = []
+    includes: List[str] = []
+    buckets = (functions, classes, uses, includes)
+    for m in _PHP_SYMBOL_RE.finditer(content_no_comments):
+        buckets[_PHP_BUCKET[m.lastgroup]].append(m.group(m.lastgroup))
 
     # Deduplicate while preserving order
     functions = list(dict.fromkeys(functions))
@@ -117,6 +308,22 @@ def extract_php_symbols(content: str) -> Tuple[List[str], List[str], List[str],
 
 
 # ---------- JavaScript/TypeScript extraction (regex) ----------
+def _iter_js_symbols(src: str, pos: int, endpos: int) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (kind, name) for JS functions/classes in src[pos:endpos], in source order.
+    Regex matches cannot overlap, so names inside a longer match are recovered
+    here: the inner name of "const x = function foo(", and declarations inside
+    an arrow function's parameter list, e.g. "const H = (class H {}) =>".
+    """
+    for m in _JS_SYMBOL_RE.finditer(src, pos, endpos):
+        kind = m.lastgroup
+        if kind == "func_expr_name":
+            yield "func_expr", m.group("func_expr")
+        yield kind, m.group(kind)
+        if kind == "arrow" or kind == "export_arrow":
+            yield from _iter_js_symbols(src, m.end(kind), m.end())
+
+
 def extract_js_symbols(content: str) -> Tuple[List[str], List[str], List[str]]:
     """
     Return (functions, classes, imports) from JS/TS using regex.
@@ -128,32 +335,21 @@ def extract_js_symbols(content: str) -> Tuple[List[str], List[str], List[str]]:
       - class ClassName
       - import ... from 'mod', require('mod'), bare import 'mod'
     """
-    # Remove simple comment styles to reduce noise
-    content_no_block = re.sub(r"/\*.*?\*/", "", content, flags=re.S)
-    content_nc = re.sub(r"//.*?$", "", content_no_block, flags=re.M)
+    # Remove comments to reduce noise
+    content_nc = _strip_comments(content, "js")
 
     functions: List[str] = []
     classes: List[str] = []
     imports: List[str] = []
 
-    # function declarations
-    functions += re.findall(r"\bfunction\s+([A-Za-z_$][\w$]*)\s*\(", content_nc)
-    # exported function declarations
-    functions += re.findall(r"\bexport\s+function\s+([A-Za-z_$][\w$]*)\s*\(", content_nc)
-    # variable-assigned function expressions
-    functions += re.findall(r"\b(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*=\s*(?:async\s*)?function\b", content_nc)
-    # variable-assigned arrow functions
-    functions += re.findall(r"\b(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*=\s*(?:async\s*)?\([^\)]*\)\s*=>", content_nc)
-    # exported variable-assigned arrow functions
-    functions += re.findall(r"\bexport\s+(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*=\s*(?:async\s*)?\([^\)]*\)\s*=>", content_nc)
-
-    # classes
-    classes += re.findall(r"\bclass\s+([A-Za-z_$][\w$]*)\b", content_nc)
+    # functions and classes, in source order
+    buckets = (functions, classes)
+    for kind, name in _iter_js_symbols(content_nc, 0, len(content_nc)):
+        buckets[_JS_BUCKET[kind]].append(name)
 
     # imports / requires (capture the whole statement for now)
-    imports += re.findall(r"""import\s+[^'"]+['"]""", content_nc)   # import X from 'mod'
-    imports += re.findall(r"""import\s*['"][^'"]+['"]""", content_nc)  # bare import 'mod'
-    imports += re.findall(r"""require\(\s*['"][^'"]+['"]\s*\)""", content_nc)  # require('mod')
+    for pat in _JS_IMPORT_RES:
+        imports += pat.findall(content_nc)
 
     # Deduplicate while preserving order
     functions = list(dict.fromkeys(functions))
@@ -166,14 +362,14 @@ def extract_js_symbols(content: str) -> Tuple[List[str], List[str], List[str]]:
 def extract_ipynb_symbols(text: str) -> Tuple[List[str], List[str], Dict[str, Optional[int]]]:
     """
     Parse a .ipynb as JSON, collect code cells, and heuristically extract
-    Python functions/classes from concatenated code. Also returns cell counts.
+    Python functions/classes from each cell's code. Also returns cell counts.
     """
     functions: List[str] = []
     classes: List[str] = []
     stats = {"nb_num_code_cells": None, "nb_num_markdown_cells": None, "nb_kernel_language": None}
 
     try:
-        nb = json.loads(text)
+        nb = loads_json(text)
     except Exception:
         return functions, classes, stats
 
@@ -187,10 +383,16 @@ def extract_ipynb_symbols(text: str) -> Tuple[List[str], List[str], Dict[str, Op
         or nb.get("metadata", {}).get("language_info", {}).get("name")
     )
 
-    concat_code = "\n\n".join("".join(c.get("source", [])) for c in code_cells)
-    py_funcs, py_classes, _imports = extract_python_symbols(concat_code)
-    functions = py_funcs
-    classes = py_classes
+    # Parse cell by cell instead of building one concatenated source string
+    for c in code_cells:
+        src = "".join(c.get("source", []))
+        if not src:
+            continue
+        py_funcs, py_classes, _imports = extract_python_symbols(src)
+        functions.extend(py_funcs)
+        classes.extend(py_classes)
+    functions = list(dict.fromkeys(functions))
+    classes = list(dict.fromkeys(classes))
     return functions, classes, stats
 
 
@@ -212,8 +414,27 @@ def extract_symbols_for_file(path: Path, lang: str, content: str):
         return [], [], {}
 
 
-def get_file_metadata(path: Path, root: Path) -> dict:
-    """Build the metadata object with the required (and helpful) fields."""
+def get_file_metadata(path: Union[Path, os.DirEntry], root: Path,
+                      st: Optional[os.stat_result] = None) -> dict:
+    """
+    Build the metadata object with the required (and helpful) fields.
+    root should already be absolute (made so once per run by the caller);
+    paths are made absolute lexically, with no per-file realpath calls.
+    Pass a DirEntry (its stat is cached) or an existing stat result as st to
+    avoid stat'ing the file again.
+    """
+    path_str = os.path.abspath(path)
+    root_str = os.path.abspath(root)
+    try:
+        if st is None:
+            st = path.stat() if isinstance(path, os.DirEntry) else os.stat(path_str)
+    except OSError:
+        return _build_metadata(path_str, root_str, None, 0)
+    return _build_metadata(path_str, root_str, st.st_mtime_ns, st.st_size)
+
+
+def _build_metadata(path_str: str, root_str: str, mtime_ns: Optional[int], size: int) -> dict:
+    path = Path(path_str)
     ext = path.suffix.lower()
     lang = LANG_BY_EXT.get(ext)
     content = read_text(path)
@@ -223,13 +444,13 @@ def get_file_metadata(path: Path, root: Path) -> dict:
     num_chars = count_chars(content)
 
     data = {
-        "file_name": os.path.basename(str(path)),
-        "file_path": str(path.resolve()),
-        "relative_path": rel_to_root(path, root),
+        "file_name": os.path.basename(path_str),
+        "file_path": path_str,
+        "relative_path": _relative_to_root(path_str, root_str),
         "extension": ext,
         "language": lang,
-        "size_bytes": path.stat().st_size if path.exists() else 0,
-        "last_modified": iso_mtime(path),
+        "size_bytes": size,
+        "last_modified": _iso_from_ns(mtime_ns),
         "num_lines": num_lines,
         "num_characters": num_chars,
         "num_functions": len(funcs),
@@ -249,32 +470,140 @@ def get_file_metadata(path: Path, root: Path) -> dict:
     return data
 
 
-def is_target_code_file(path: Path) -> bool:
-    """Return True if file extension indicates Python/PHP/JS/Notebook."""
-    return path.is_file() and path.suffix.lower() in LANG_BY_EXT
+def is_target_code_file(path: Union[Path, os.DirEntry]) -> bool:
+    """
+    Return True if file extension indicates Python/PHP/JS/Notebook.
+    Accepts a Path or a DirEntry (whose is_file() is answered from the listing).
+    The extension is checked first so non-targets never cost a stat.
+    """
+    return path.name.lower().endswith(_CODE_SUFFIXES) and path.is_file()
+
+
+def _metadata_worker(path_str: str, root_str: str, st: os.stat_result) -> dict:
+    """Process-pool entry point: rebuild Paths from strings and extract metadata."""
+    return get_file_metadata(Path(path_str), Path(root_str), st)
+
+
+def load_cache(cache_path: Path, root: Path) -> Dict[str, dict]:
+    """
+    Load cached metadata entries for root; empty if missing, unreadable, for
+    another root or written by a different CACHE_VERSION.
+    """
+    try:
+        with open(cache_path, "rb") as f:
+            data = loads_json(f.read())
+    except Exception:
+        return {}
+    if not isinstance(data, dict) or data.get("version") != CACHE_VERSION or data.get("root") != str(root):
+        return {}
+    return data.get("files", {})
+
+
+def save_cache(cache_path: Path, root: Path, entries: Dict[str, dict]) -> None:
+    """Persist cache entries (relative_path -> {mtime_ns, size, metadata})."""
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, "wb") as f:
+            f.write(dumps_json({"version": CACHE_VERSION, "root": str(root), "files": entries}))
+    except Exception as e:
+        print(f"[WARN] Could not write cache {cache_path}: {e}")
+
+
+def iter_metadata(repo_path: Path, cores: Optional[int] = None,
+                  cache_path: Optional[Path] = None) -> Iterator[dict]:
+    """
+    Yield metadata for every target file under repo_path, in walk order.
+    Files are independent, so the work is spread over a process pool.
+    With cache_path, files whose (relative path, mtime, size) are unchanged
+    since the last run reuse their cached metadata instead of being re-parsed;
+    the cache is rewritten once the iterator is exhausted.
+    """
+    root_str = str(repo_path)
+    entries = list(walk_files(root_str, _CODE_SUFFIXES))
+    cache = load_cache(cache_path, repo_path) if cache_path else {}
+    # Every walked path starts with this prefix, so keys are a slice away
+    prefix_len = len(os.path.join(root_str, ""))
+
+    # Sized up front: the walk already produced every entry
+    keys: List[Optional[str]] = [None] * len(entries)
+    hits: Dict[int, dict] = {}
+    new_cache: Dict[str, dict] = {}
+    misses: List[Tuple[str, os.stat_result]] = []
+    for i, e in enumerate(entries):
+        st = e.stat()
+        key = e.path[prefix_len:].replace(os.sep, "/")
+        entry = {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+        cached = cache.get(key)
+        if cached and cached.get("mtime_ns") == entry["mtime_ns"] and cached.get("size") == entry["size"]:
+            hits[i] = cached["metadata"]
+        else:
+            misses.append((e.path, st))
+        keys[i] = key
+        new_cache[key] = entry
+
+    # Workers are only spawned if there are misses to submit
+    with ProcessPoolExecutor(max_workers=cores, mp_context=_POOL_CONTEXT) as executor:
+        computed = executor.map(_metadata_worker, [m[0] for m in misses], repeat(root_str),
+                                [m[1] for m in misses], chunksize=32)
+        for i, key in enumerate(keys):
+            meta = hits[i] if i in hits else next(computed)
+            if cache_path:
+                new_cache[key]["metadata"] = meta
+            yield meta
+
+    if cache_path:
+        save_cache(cache_path, repo_path, new_cache)
+
+
+def write_metadata_json(records: Iterable[dict], out_path: Path) -> int:
+    """
+    Stream records into a JSON array at out_path, serializing one record at a
+    time so the full result list never has to be held in memory.
+    The array goes to a temporary file that replaces out_path only once
+    complete, so an interrupted run never leaves a truncated file behind.
+    Returns the number of records written.
+    """
+    count = 0
+    tmp_path = str(out_path) + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(b"[")
+            for meta in records:
+                f.write(b",\n" if count else b"\n")
+                f.write(dumps_json(meta))
+                count += 1
+            f.write(b"\n]\n" if count else b"]\n")
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return count
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Extract code metadata from a repository.")
+    parser.add_argument("--cores", type=int, default=None,
+                        help="Number of worker processes (default: chosen by ProcessPoolExecutor, "
+                             "all CPUs capped at 61 on Windows).")
+    args = parser.parse_args()
+
     repo_path = Path(REPO_DIR).resolve()
     if not repo_path.exists():
         print(f"[ERROR] Directory not found: {repo_path}")
         return
 
-    results = []
-    for file_path in repo_path.rglob("*"):
-        if is_target_code_file(file_path):
-            results.append(get_file_metadata(file_path, repo_path))
-
     # Ensure output folder exists
     out_path = Path(OUTPUT_JSON)
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=4)
+    count = write_metadata_json(iter_metadata(repo_path, args.cores, Path(CACHE_JSON)), out_path)
 
-    print(f"[INFO] Metadata extracted for {len(results)} files.")
+    print(f"[INFO] Metadata extracted for {count} files.")
     print(f"[INFO] JSON saved at: {out_path}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -4,10 +4,16 @@ import subprocess
 import sys
 import tempfile
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from urllib.parse import urlparse
 from urllib.request import urlopen, Request
 
+# ZIP fallback tuning
+ZIP_SPOOL_MAX_BYTES = 64 * 1024 * 1024  # keep archives up to this size in memory
+ZIP_COPY_CHUNK = 1 << 20                # 1 MiB reads from the HTTP response
+ZIP_EXTRACT_WORKERS = 8
+
 
 def download_github_repo(repo_url: str) -> str:
     """
@@ -41,8 +47,7 @@ def download_github_repo(repo_url: str) -> str:
 
     # Make a destination directory name from the repo URL (owner_repo_XXXX)
     parsed = urlparse(repo_url)
-    name_hint = Path(parsed.path).stem or "repo"
-    dest_dir = _unique_dir(base_dir, f"{name_hint}_repo")
+    dest_dir = _unique_dir(base_dir, f"{repo_name_hint(repo_url)}_repo")
 
     # 1) Try git clone first (best fidelity)
     if _has_git():
@@ -72,6 +77,11 @@ def download_github_repo(repo_url: str) -> str:
     )
 
 
+def repo_name_hint(repo_url: str) -> str:
+    """Repository name used for the clone directory (<name>_repo_<n>) of repo_url."""
+    return Path(urlparse(repo_url.strip()).path).stem or "repo"
+
+
 def _has_git() -> bool:
     """Return True if 'git' is available on PATH."""
     try:
@@ -81,6 +91,27 @@ def _has_git() -> bool:
         return False
 
 
+def is_clone_up_to_date(repo_url: str, local_path: str) -> bool:
+    """
+    Return True if local_path is a git clone whose HEAD matches the remote HEAD
+    of repo_url (checked with a cheap 'git ls-remote', no fetch).
+    """
+    if not (Path(local_path) / ".git").is_dir() or not _has_git():
+        return False
+    try:
+        local = subprocess.run(
+            ["git", "-C", str(local_path), "rev-parse", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        remote = subprocess.run(
+            ["git", "ls-remote", repo_url, "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.split()
+    except Exception:
+        return False
+    return bool(local) and bool(remote) and remote[0] == local
+
+
 def _git_clone(repo_url: str, dest_dir: Path) -> None:
     """Clone the repo using git into dest_dir."""
     dest_dir.mkdir(parents=True, exist_ok=True)
@@ -128,31 +159,61 @@ def _download_and_extract_zip(zip_url: str, dest_dir: Path) -> None:
     """Download a ZIP from zip_url and extract into dest_dir."""
     # Basic browser-like headers to avoid some blocks
     req = Request(zip_url, headers={"User-Agent": "Mozilla/5.0"})
-    with urlopen(req) as resp:
-        if resp.status != 200:
-            raise RuntimeError(f"HTTP {resp.status} when fetching {zip_url}")
-        tmp_zip = dest_dir / "repo.zip"
-        with open(tmp_zip, "wb") as f:
-            f.write(resp.read())
-
-    # Extract
-    with zipfile.ZipFile(tmp_zip, "r") as zf:
-        zf.extractall(dest_dir)
-    # Remove zip after extraction
-    try:
-        tmp_zip.unlink()
-    except Exception:
-        pass
+    # Spool in memory up to ZIP_SPOOL_MAX_BYTES, then transparently roll over to disk
+    with tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_MAX_BYTES) as spool:
+        with urlopen(req) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"HTTP {resp.status} when fetching {zip_url}")
+            shutil.copyfileobj(resp, spool, length=ZIP_COPY_CHUNK)
+        spool.seek(0)
+
+        # Extract
+        with zipfile.ZipFile(spool, "r") as zf:
+            _extract_members_parallel(zf, dest_dir)
 
     # If GitHub creates a top-level folder like 'repo-<branch>', flatten it
     _flatten_single_subdir(dest_dir)
 
 
+def _extract_members_parallel(zf: zipfile.ZipFile, dest_dir: Path) -> None:
+    """
+    Extract all members of zf into dest_dir using a thread pool.
+    zipfile creates (and, on Windows, sanitizes) each member's parent
+    directories itself, so the first member of every directory is extracted
+    serially; workers then only write into directories that already exist.
+    zlib decompression and file writes release the GIL.
+    """
+    first_in_dir = {}
+    rest = []
+    for info in zf.infolist():
+        if info.is_dir():
+            zf.extract(info, dest_dir)
+            continue
+        parent = info.filename.rpartition("/")[0]
+        if parent in first_in_dir:
+            rest.append(info)
+        else:
+            first_in_dir[parent] = info
+    for info in first_in_dir.values():
+        zf.extract(info, dest_dir)
+
+    with ThreadPoolExecutor(max_workers=ZIP_EXTRACT_WORKERS) as pool:
+        # list() re-raises the first extraction error, if any
+        list(pool.map(lambda info: zf.extract(info, dest_dir), rest))
+
+
 def _flatten_single_subdir(dest_dir: Path) -> None:
     """If dest_dir contains exactly one directory, move its contents up and delete it."""
     entries = [p for p in dest_dir.iterdir()]
     if len(entries) == 1 and entries[0].is_dir():
         top = entries[0]
+        # Same filesystem by construction: swap the directory in with renames (O(1))
+        tmp = dest_dir.with_name(dest_dir.name + ".tmp")
+        if not tmp.exists():
+            os.rename(top, tmp)
+            dest_dir.rmdir()
+            os.rename(tmp, dest_dir)
+            return
         for item in top.iterdir():
             shutil.move(str(item), dest_dir / item.name)
         shutil.rmtree(top, ignore_errors=True)
@@ -1,7 +1,10 @@
+import hashlib
 import os
 import re
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Iterator, Optional, Tuple
 
 # --- CONFIG: extend if needed ---
 CODE_EXTENSIONS = {
@@ -45,21 +48,55 @@ NON_CODE_BINARY_EXTS = {
     ".exe", ".dll",
     ".ttf", ".otf", ".woff", ".woff2",
     ".doc", ".docx", ".ppt", ".pptx", ".xls", ".xlsx",
+    # Compiled objects, archives and databases
+    ".so", ".a", ".o", ".class", ".jar", ".wasm", ".bin",
+    ".db", ".sqlite", ".pyc", ".pyo",
 }
 
+# Files larger than this are treated as generated/vendored data, not source
+MAX_CODE_FILE_BYTES = 2 * 1024 * 1024
 
-def is_probably_text(file_path: Path, sample_bytes: int = 1024) -> bool:
+# Typical code markers looked for in the head of extension-less/ambiguous files
+# (all lowercase: matched against the lowercased head)
+CODE_MARKERS = (
+    "def ", "class ", "public ", "private ", "package ",
+    "function ", "=>", "println", "console.log",
+    "var ", "let ", "const ",
+    "if (", "for (", "while (", "{", "}",
+    "using ", "namespace ",
+    # XML build/config
+    "<project", "<configuration", "<properties>", "<dependencies>",
+    # SQL
+    "select ", "create table", "insert into", "alter table",
+    # CI/CD YAML
+    "pipeline:", "stages:", "jobs:", "steps:",
+)
+
+# Concurrent copy settings for copy_code_files
+COPY_WORKERS = 16
+COPY_CHUNK = 1 << 30  # max bytes per copy_file_range call
+
+# Written into the destination root; its mtime marks the last change to the copied set
+STAMP_NAME = ".stamp"
+
+
+def _sniff(file_path: Path, sample_bytes: int) -> Optional[bytes]:
+    """Read up to sample_bytes from the start of the file in one raw read; None if unreadable."""
+    try:
+        with open(file_path, "rb", buffering=0) as f:
+            return f.read(sample_bytes)
+    except Exception:
+        return None
+
+
+def is_probably_text(file_path: Path, sample_bytes: int = 1024, head: Optional[bytes] = None) -> bool:
     """
     Naive binary check: read a small chunk and look for NUL bytes.
-    Helps avoid copying obvious binaries.
+    Helps avoid copying obvious binaries. Pass head to reuse bytes already read.
     """
-    try:
-        with open(file_path, "rb") as f:
-            chunk = f.read(sample_bytes)
-        return b"\x00" not in chunk
-    except Exception:
-        # If unreadable, treat as non-text
-        return False
+    chunk = _sniff(file_path, sample_bytes) if head is None else head[:sample_bytes]
+    # If unreadable, treat as non-text
+    return chunk is not None and b"\x00" not in chunk
 
 
 def has_code_markers(file_path: Path, sample_chars: int = 2000) -> bool:
@@ -68,45 +105,40 @@ def has_code_markers(file_path: Path, sample_chars: int = 2000) -> bool:
       - Shebangs (#!), imports, common keywords or braces.
     Used for extension-less/ambiguous files.
     """
-    if not is_probably_text(file_path):
-        return False
-
-    try:
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            head = f.read(sample_chars)
-    except Exception:
+    # One read serves both the NUL check and the marker scan
+    raw = _sniff(file_path, max(sample_chars, 1024))
+    if raw is None or not is_probably_text(file_path, head=raw):
         return False
 
+    head = raw.decode("utf-8", errors="ignore")[:sample_chars]
     head_lower = head.lower()
 
     # Shebang or typical import lines
     if head.startswith("#!") or "from " in head_lower or "import " in head_lower:
         return True
 
-    markers = [
-        "def ", "class ", "public ", "private ", "package ",
-        "function ", "=>", "println", "console.log",
-        "var ", "let ", "const ",
-        "if (", "for (", "while (", "{", "}",
-        "using ", "namespace ",
-        # XML build/config
-        "<project", "<configuration", "<properties>", "<dependencies>",
-        # SQL
-        "select ", "create table", "insert into", "alter table",
-        # CI/CD YAML
-        "pipeline:", "stages:", "jobs:", "steps:",
-    ]
-    return any(m in head_lower for m in markers) or any(m in head for m in markers)
+    # Markers are all lowercase, so one scan of the lowercased head also covers
+    # every case-sensitive match in the original head.
+    return any(m in head_lower for m in CODE_MARKERS)
 
 
-def is_code_file(file_path: Path) -> bool:
+def is_code_file(file_path: Path, size: Optional[int] = None) -> bool:
     """
     Decide if a file is code-like by:
+      0) Skip files over MAX_CODE_FILE_BYTES (size may be passed in from a cached stat)
       1) Special name-only matches (Dockerfile, Makefile)
       2) Extension whitelist (CODE_EXTENSIONS)
       3) Avoid known binary extensions
       4) Content heuristics for extension-less or uncommon types
     """
+    if size is None:
+        try:
+            size = os.stat(file_path).st_size
+        except OSError:
+            return False
+    if size > MAX_CODE_FILE_BYTES:
+        return False
+
     basename = file_path.name
     if basename in NAME_ONLY_CODE:
         return True
@@ -123,6 +155,55 @@ def is_code_file(file_path: Path) -> bool:
     return has_code_markers(file_path)
 
 
+def walk_files(root: str, suffixes: Optional[Tuple[str, ...]] = None) -> Iterator[os.DirEntry]:
+    """
+    Yield a DirEntry for every file under root using os.scandir; with suffixes,
+    only files whose lowercased name ends with one of them.
+    Directory/file checks come from the cached listing; symlinked dirs are not
+    followed, and unreadable directories are skipped.
+    """
+    stack = [root]
+    while stack:
+        d = stack.pop()
+        try:
+            it = os.scandir(d)
+        except OSError:
+            continue
+        with it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    stack.append(e.path)
+                elif (suffixes is None or e.name.lower().endswith(suffixes)) and e.is_file():
+                    yield e
+
+
+def _copy_file(src: Path, dst: Path) -> None:
+    """
+    Copy src to dst with metadata, like shutil.copy2.
+    On Linux, try os.copy_file_range first: the kernel copies without a
+    userspace round-trip and can reflink on filesystems that support it.
+    Some filesystems and pseudo-files report 0 bytes copied for non-empty
+    files, so unless the byte count matches the source size, copy2 redoes it.
+    """
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                in_fd, out_fd = fsrc.fileno(), fdst.fileno()
+                size = os.fstat(in_fd).st_size
+                copied = 0
+                while True:
+                    n = os.copy_file_range(in_fd, out_fd, COPY_CHUNK)
+                    if not n:
+                        break
+                    copied += n
+            if copied == size:
+                shutil.copystat(src, dst)
+                return
+        except OSError:
+            pass  # e.g. cross-device or unsupported filesystem
+    shutil.copy2(src, dst)
+
+
 def derive_repo_name_from_folder(folder_name: str) -> str:
     """
     Derive a clean repo name from a source folder.
@@ -135,11 +216,27 @@ def derive_repo_name_from_folder(folder_name: str) -> str:
     return m.group(1) if m else folder_name
 
 
+def _update_stamp(stamp_path: Path, fingerprint: str) -> None:
+    """
+    Rewrite the stamp only when the fingerprint of the copied files changed,
+    so its mtime is the time the destination last changed.
+    """
+    try:
+        if stamp_path.read_text(encoding="utf-8") == fingerprint:
+            return
+    except OSError:
+        pass
+    stamp_path.write_text(fingerprint, encoding="utf-8")
+
+
 def copy_code_files(src_repo_dir: str, working_root: str) -> str:
     """
     Walk the repo at src_repo_dir, copy only 'code files' into:
         working_root / <repo_name> / <preserved relative structure>
 
+    Also maintains working_root / <repo_name> / STAMP_NAME, touched whenever
+    the set of copied files (paths, mtimes, sizes) differs from the last run.
+
     Returns the destination root path.
     """
     src = Path(src_repo_dir).resolve()
@@ -150,14 +247,32 @@ def copy_code_files(src_repo_dir: str, working_root: str) -> str:
     dest_root = Path(working_root).resolve() / repo_name
     dest_root.mkdir(parents=True, exist_ok=True)
 
-    for path in src.rglob("*"):
-        if path.is_file():
-            rel = path.relative_to(src)
-            dest_file = dest_root / rel
+    tasks = []
+    signature = []
+    # Walked paths all start with src + separator; slice it off instead of relpath
+    prefix_len = len(os.path.join(str(src), ""))
+    for entry in walk_files(str(src)):
+        # Inlined fast reject (same result as is_code_file) before building a Path
+        if os.path.splitext(entry.name)[1].lower() in NON_CODE_BINARY_EXTS:
+            continue
+        path = Path(entry.path)
+        st = entry.stat()
+        if is_code_file(path, st.st_size):
+            rel = entry.path[prefix_len:]
+            tasks.append((path, dest_root / rel))
+            signature.append(f"{rel}\0{st.st_mtime_ns}\0{st.st_size}\n")
+
+    # Create each destination directory once, then copy concurrently
+    for parent in {dest.parent for _, dest in tasks}:
+        parent.mkdir(parents=True, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS) as pool:
+        # list() re-raises the first copy error, if any
+        list(pool.map(lambda t: _copy_file(*t), tasks))
 
-            if is_code_file(path):
-                dest_file.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy2(path, dest_file)
+    # Sorted, so walk order does not affect the fingerprint
+    signature.sort()
+    fingerprint = hashlib.sha256("".join(signature).encode("utf-8", "surrogateescape")).hexdigest()
+    _update_stamp(dest_root / STAMP_NAME, fingerprint)
 
     return str(dest_root)
 
@@ -1,126 +1,240 @@
 import os
+import sys
 import json
-import clone_repo as cr
-import iterate as it
-import analyze_code as ac
-import analyze_code as anc
-import ai_analyzer as aa
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Optional
+
+# Per-step progress output; set DOCASSIST_VERBOSE=1 to enable
+VERBOSE = os.environ.get("DOCASSIST_VERBOSE") == "1"
+
+# Working directories created by intial_setup
+BASE_DIR = r"codehub"
+SETUP_DIRS = tuple(os.path.join(BASE_DIR, d) for d in ("repos", "destination", "extract", "documents"))
+
+# Repository URL -> local clone path, used to skip re-cloning unchanged repos
+REPO_CACHE_JSON = os.path.join(BASE_DIR, ".repo_cache.json")
+
+# Documentation generations allowed to run at once while later repos are prepared
+DOC_WORKERS = 4
+
+def _basename(p: str) -> str:
+    """Last path component, robust across OS/path variants and trailing separators."""
+    return os.path.basename(os.path.normpath(p))
+
+def metadata_path(project_name: str) -> str:
+    """
+    Per-project metadata file, so a repo being analyzed never overwrites the
+    metadata another repo's documentation generation is still reading.
+    """
+    return r"codehub/extract/"+project_name+"_metadata.json"
+
+def expected_project_name(repo_url: str) -> str:
+    """
+    Project name prepare_repo will produce for repo_url: the clone folder's
+    name hint with iterate's "_repo_<n>" suffix removed.
+    """
+    import clone_repo as cr
+    import iterate as it
+
+    return it.derive_repo_name_from_folder(f"{cr.repo_name_hint(repo_url)}_repo_1")
+
+def _metadata_is_current(metadata_file: str, *inputs: str) -> bool:
+    """
+    True if metadata_file was written after every file in inputs last changed
+    (the iterate.STAMP_NAME stamp, the extractor's source); False if any is missing.
+    """
+    try:
+        written = os.stat(metadata_file).st_mtime_ns
+        return all(written >= os.stat(f).st_mtime_ns for f in inputs)
+    except OSError:
+        return False
+
+def _load_repo_cache() -> dict:
+    """URL -> local clone path from previous runs; empty if missing or unreadable."""
+    try:
+        with open(REPO_CACHE_JSON, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except Exception:
+        return {}
+
+def _save_repo_cache(cache: dict) -> None:
+    try:
+        with open(REPO_CACHE_JSON, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=4)
+    except Exception as e:
+        print(f"Warning: could not write {REPO_CACHE_JSON}: {e}")
 
 def download_repo(url: str) -> str:
     """
     Clones the repo and returns the repository folder name (last path component).
     Example full path: C:\\AI\\DocAssist\\codehub\\repos\\final-year-project_repo_6
     Returns: final-year-project_repo_6
+    If an earlier clone of url is still at the remote HEAD, it is reused instead.
+    Raises on failure (see clone_repo.download_github_repo).
     """
-    try:
-        local_path = cr.download_github_repo(url)
-        # Use os.path to be robust across OS/path variants
-        return os.path.basename(os.path.normpath(local_path))
-    except Exception as e:
-        print(f"Error: {e}")
-        return "error"
+    import clone_repo as cr
+
+    cache = _load_repo_cache()
+    cached_path = cache.get(url)
+    if cached_path and cr.is_clone_up_to_date(url, cached_path):
+        if VERBOSE:
+            print(f"Reusing up-to-date clone: {cached_path}")
+        return _basename(cached_path)
+
+    local_path = cr.download_github_repo(url)
+    cache[url] = local_path
+    _save_repo_cache(cache)
+    return _basename(local_path)
 
 def iterate_repo(src_dir: str) -> str:
     """
     Copies code files from src_dir to WORKING_ROOT and returns destination path.
     """
-    try:
-        WORKING_ROOT = r"codehub/destination"
-        dest = it.copy_code_files(src_dir, WORKING_ROOT)
+    import iterate as it
+
+    WORKING_ROOT = r"codehub/destination"
+    dest = it.copy_code_files(src_dir, WORKING_ROOT)
+    if VERBOSE:
         print(f"Code files copied to: {dest}")
-        return dest
-    except Exception as e:
-        print(f"Error: {e}")
-        return "error"
-    
+    return dest
+
 def documentation_generation(project_name: str) -> str:
     """
-    Analyzes metadata and generates documentation.
+    Analyzes metadata and generates documentation; returns the output file path.
     """
-    try:
-        output_file = r"codehub/documents/"+project_name+"_generated_documentation.txt"
-        SRC_DIR = r"codehub/extract/metadata.json"
-        aa.analyse_metadata(output_file,SRC_DIR)
-    except Exception as e:
-        print(f"Error: {e}")   
+    # Imported lazily: ai_analyzer pulls in the openai SDK (httpx, pydantic, ...)
+    import ai_analyzer as aa
+
+    output_file = r"codehub/documents/"+project_name+"_generated_documentation.txt"
+    SRC_DIR = metadata_path(project_name)
+    aa.analyse_metadata(output_file,SRC_DIR)
+    return output_file
 
 def intial_setup():
     """
     Initial setup for directories.
     """
     try:
-        base_path = Path(r"codehub")
-        repos_path = base_path / "repos"
-        destination_path = base_path / "destination"
-        extract_path = base_path / "extract"
-        extract_document = base_path / "documents"
-
         # Create directories if they don't exist
-        repos_path.mkdir(parents=True, exist_ok=True)
-        destination_path.mkdir(parents=True, exist_ok=True)
-        extract_path.mkdir(parents=True, exist_ok=True)
-        extract_document.mkdir(parents=True, exist_ok=True)
+        for d in SETUP_DIRS:
+            os.makedirs(d, exist_ok=True)
 
-        print(f"Directories set up at: {base_path.resolve()}")
+        if VERBOSE:
+            print(f"Directories set up at: {os.path.abspath(BASE_DIR)}")
     except Exception as e:
         print(f"Error during initial setup: {e}") 
 
 
-def main():
-    repo_url=input("Enter the GitHub repository URL: ")
-    # Use a raw string literal for Windows paths
-    intial_setup()
-    # 1) If you want to derive the folder name from a fresh clone, uncomment:
+def prepare_repo(repo_url: str) -> Optional[str]:
+    """
+    Clones the repo, copies its code files and extracts metadata.
+    Returns the project name, or None if there was nothing to analyze.
+    Errors from clone/copy propagate to the caller.
+    """
+    import analyze_code as ac
+    import iterate as it
+
+    # 1) Clone the repo (or reuse an up-to-date earlier clone); gives the clone's folder name
     project_name = download_repo(repo_url)
-    if project_name == "error":
-        print("Error downloading repository.")
-        return
-    print(f"Project name: {project_name}")
+    if VERBOSE:
+        print(f"Project name: {project_name}")
     #-----------------------------------------------------
-    # 2)Otherwise, use the given absolute path:
-    project_path = r"C:\AI\DocAssist\codehub\repos\\"+project_name
-    src_dir = project_path
+    # 2) Copy code files out of the clone (platform-neutral path under codehub/repos)
+    src_dir = str(Path(BASE_DIR) / "repos" / project_name)
     result = iterate_repo(src_dir)
-    if result == "error":
-        print("Error in iterating repository.")
-        return
-    project_name=result.split("\\")[-1]
-   # If you need just the repo folder name from the absolute path:
-    repo_folder = os.path.basename(os.path.normpath(src_dir))
-    print(f"Repo folder: {repo_folder}")
+    # iterate strips the clone's "_repo_<n>" suffix, so take the name from its result
+    project_name = _basename(result)
+    repo_folder = _basename(src_dir)
+    if VERBOSE:
+        print(f"Repo folder: {repo_folder}")
 #   #  -----------------------------------------------------
-    # #3) Analyze code files and extract metadata
-    REPO_DIR = r"codehub/destination/"+project_name  # change to your repo folder
-    OUTPUT_JSON = r"codehub/extract/metadata.json"
+    # 3) Analyze code files and extract metadata from iterate's copy of the project
+    REPO_DIR = r"codehub/destination/"+project_name
+    OUTPUT_JSON = metadata_path(project_name)
 
-    repo_path = Path(REPO_DIR).resolve()
-    if not repo_path.exists():
+    # REPO_DIR is built by us from iterate's output: absolutize lexically, no realpath walk
+    repo_path = Path(os.path.abspath(REPO_DIR))
+    if not os.path.isdir(REPO_DIR):
         print(f"[ERROR] Directory not found: {repo_path}")
-        return
+        return None
 
-    results = []
-    for file_path in repo_path.rglob("*"):
-        if ac.is_target_code_file(file_path):
-            results.append(ac.get_file_metadata(file_path, repo_path))
+    # Neither the copied code nor the extractor changed since the metadata was
+    # written: skip the walk
+    stamp_file = os.path.join(REPO_DIR, it.STAMP_NAME)
+    if _metadata_is_current(OUTPUT_JSON, stamp_file, ac.__file__):
+        sys.stdout.write(f"[INFO] Code unchanged, reusing metadata at: {OUTPUT_JSON}\n")
+        return project_name
 
     # Ensure output folder exists
     out_path = Path(OUTPUT_JSON)
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=4)
+    # Extract in parallel (process pool, results kept in file order) and
+    # stream each record to disk as it is produced instead of collecting a list
+    records = ac.iter_metadata(repo_path)
+    count = ac.write_metadata_json(records, out_path)
+
+    sys.stdout.write(f"[INFO] Metadata extracted for {count} files.\n[INFO] JSON saved at: {out_path}\n")
+    return project_name
 
-    print(f"[INFO] Metadata extracted for {len(results)} files.")
-    print(f"[INFO] JSON saved at: {out_path}")
 
+def main():
+    """
+    Runs the pipeline for every entered URL. Failures are logged per
+    repository without stopping the others; if any repository failed, exits
+    with status 1 once the rest have finished.
+    """
+    # The same URL entered twice is prepared once
+    repo_urls = list(dict.fromkeys(input("Enter the GitHub repository URL(s), separated by spaces: ").split()))
+    intial_setup()
+    # Steps 1-3 run in this thread; 4) documentation generation (the slow Azure
+    # call) runs in the pool, so it overlaps with preparing the next repository.
+    with ThreadPoolExecutor(max_workers=DOC_WORKERS) as pool:
+        doc_builds = []
+        seen = {}
+        failures = 0
+        for repo_url in repo_urls:
+            # Destination, metadata and documentation files are all named after
+            # the project, so a second repo with the same name would clobber them
+            expected = expected_project_name(repo_url)
+            if expected in seen:
+                logging.error("Skipping %s: project name %r is already used by %s",
+                              repo_url, expected, seen[expected])
+                failures += 1
+                continue
+            seen[expected] = repo_url
+            # One failing repository should not stop the others
+            try:
+                project_name = prepare_repo(repo_url)
+            except Exception:
+                logging.exception("Failed to prepare %s", repo_url)
+                failures += 1
+                continue
+            if project_name is None:
+                failures += 1
+                continue
 # #------------------------------------------
 # # 4) Analyze metadata and generate documentation
-    doc_build=documentation_generation(project_name)
-    if doc_build == "error":
-        print("Error in documentation generation.")
-        return
-    
+            doc_builds.append((project_name, pool.submit(documentation_generation, project_name)))
+
+        for project_name, doc_build in doc_builds:
+            try:
+                doc_build.result()
+            except Exception:
+                logging.exception("Documentation generation failed for %s", project_name)
+                failures += 1
+
+    if failures:
+        logging.error("%d of %d repositories failed", failures, len(repo_urls))
+        sys.exit(1)
+
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except Exception as e:
+        logging.exception(e)
+        sys.exit(1)